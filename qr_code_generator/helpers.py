@@ -20,6 +20,11 @@ class Config(dict):
         self['OUTPUT_FOLDER'] = 'output'
         self['VERBOSE'] = False
 
+        # Post-processing: derive extra sizes / formats locally from the fetched QR code
+        self['VARIANTS'] = []
+        self['PROCESSES'] = None
+        self['POOL_THRESHOLD'] = 4
+
 
 class Options(dict):
     """
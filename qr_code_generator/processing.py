@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+from io import BytesIO
+import re
+
+# Formats that can be derived locally from a single fetched QR code.
+VECTOR_FORMATS = ['SVG']
+RASTER_FORMATS = ['PNG', 'JPG']
+
+
+def can_derive(source_format, image_format):
+    """
+    Checks whether or not a variant in image_format can be derived locally from a QR code in source_format.
+    >>> can_derive('SVG', 'PNG')
+    True
+    >>> can_derive('PNG', 'SVG')
+    False
+
+    Parameters
+    ----------
+    source_format : str
+        The image format of the QR code that was fetched from the API.
+    image_format : str
+        The image format of the variant that should be derived.
+
+    Returns
+    -------
+    bool
+        Whether or not the variant can be derived without another request to the API.
+    """
+    source_format = source_format.upper()
+    image_format = image_format.upper()
+    if source_format in VECTOR_FORMATS:
+        return image_format in VECTOR_FORMATS + RASTER_FORMATS
+    if source_format in RASTER_FORMATS:
+        return image_format in RASTER_FORMATS
+    return False
+
+
+def render_variant(content, source_format, image_width, image_format):
+    """
+    Derives a single variant of a fetched QR code. Defined at module level, so it can be sent to a process pool.
+
+    Parameters
+    ----------
+    content : str or bytes
+        The content of the fetched QR code. Text for SVG, bytes for raster formats.
+    source_format : str
+        The image format of the fetched QR code.
+    image_width : int
+        The width in pixels of the variant.
+    image_format : str
+        The image format of the variant.
+
+    Raises
+    ------
+    ValueError
+        The variant cannot be derived from the fetched QR code.
+    ImportError
+        Rasterizing requires the optional dependencies, install them with pip install qr_code_generator_api[raster].
+
+    Returns
+    -------
+    content : str or bytes
+        The content of the variant. Text for SVG, bytes for raster formats.
+    """
+    source_format = source_format.upper()
+    image_format = image_format.upper()
+    if not can_derive(source_format, image_format):
+        raise ValueError(f'Cannot derive a {image_format} variant from a {source_format} source')
+
+    if source_format in VECTOR_FORMATS:
+        content = resize_svg(content, image_width)
+        if image_format in VECTOR_FORMATS:
+            return content
+        return rasterize_svg(content, image_width, image_format)
+    return resize_raster(content, image_width, image_format)
+
+
+def check_dependencies(source_format, formats):
+    """
+    Checks whether or not the optional dependencies needed to derive the given variant formats can be imported.
+    >>> check_dependencies('SVG', ['SVG'])
+
+    Parameters
+    ----------
+    source_format : str
+        The image format of the QR code that will be fetched from the API.
+    formats : list
+        The image formats of the variants that should be derived.
+
+    Raises
+    ------
+    ImportError
+        A dependency needed to derive one of the variants is not installed.
+
+    Returns
+    -------
+    None
+    """
+    formats = [image_format.upper() for image_format in formats]
+    raster = [image_format for image_format in formats if image_format in RASTER_FORMATS]
+    if not raster:
+        return
+    if source_format.upper() in VECTOR_FORMATS:
+        _import_cairosvg()
+        if any(image_format != 'PNG' for image_format in raster):
+            _import_image()
+    else:
+        _import_image()
+
+
+def resize_svg(content, image_width):
+    """
+    Scales an SVG document to the requested width by rewriting the size of the root element.
+    >>> resize_svg('<svg width="500" height="500"><rect/></svg>', 250)
+    '<svg width="250" height="250" viewBox="0 0 500 500"><rect/></svg>'
+
+    Parameters
+    ----------
+    content : str
+        The SVG document as text.
+    image_width : int
+        The width in pixels the document should be rendered at.
+
+    Raises
+    ------
+    ValueError
+        The content does not contain an svg element.
+
+    Returns
+    -------
+    content : str
+        The scaled SVG document.
+    """
+    match = re.search(r'<svg\b[^>]*>', content)
+    if not match:
+        raise ValueError('Content is not an SVG document')
+    tag = match.group(0)
+
+    width = _svg_length(tag, 'width')
+    height = _svg_length(tag, 'height')
+    image_height = round(image_width * height / width) if width and height else image_width
+
+    # Without a viewBox the drawing would be cropped instead of scaled, so pin it to the original size
+    if not re.search(r'\sviewBox\s*=', tag) and width and height:
+        tag = _set_svg_attribute(tag, 'viewBox', f'0 0 {_format_number(width)} {_format_number(height)}')
+    tag = _set_svg_attribute(tag, 'width', str(image_width))
+    tag = _set_svg_attribute(tag, 'height', str(image_height))
+
+    return content[:match.start()] + tag + content[match.end():]
+
+
+def rasterize_svg(content, image_width, image_format):
+    """
+    Renders an SVG document to a raster image of the requested width.
+
+    Parameters
+    ----------
+    content : str
+        The SVG document as text.
+    image_width : int
+        The width in pixels of the raster image.
+    image_format : str
+        The raster format to render to.
+
+    Returns
+    -------
+    content : bytes
+        The rendered raster image.
+    """
+    cairosvg = _import_cairosvg()
+    png = cairosvg.svg2png(bytestring=content.encode('utf-8'), output_width=image_width)
+    if image_format.upper() == 'PNG':
+        return png
+    return resize_raster(png, image_width, image_format)
+
+
+def resize_raster(content, image_width, image_format):
+    """
+    Resizes a raster image to the requested width, keeping its aspect ratio.
+    Upscaling uses nearest neighbour resampling, so the modules of the QR code keep sharp edges.
+
+    Parameters
+    ----------
+    content : bytes
+        The raster image.
+    image_width : int
+        The width in pixels of the resized image.
+    image_format : str
+        The raster format to save the resized image in.
+
+    Returns
+    -------
+    content : bytes
+        The resized raster image.
+    """
+    Image = _import_image()
+    with Image.open(BytesIO(content)) as image:
+        if image.width != image_width:
+            image_height = max(1, round(image.height * image_width / image.width))
+            # Smoothing filters blur and ring around module edges when enlarging, which hurts scanning
+            resample = Image.NEAREST if image_width > image.width else Image.LANCZOS
+            image = image.resize((image_width, image_height), resample)
+
+        # JPEG has no alpha channel, so flatten transparent images on a white background
+        if image_format.upper() == 'JPG':
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.split()[-1])
+                image = background
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+
+        out = BytesIO()
+        image.save(out, format='JPEG' if image_format.upper() == 'JPG' else image_format.upper())
+    return out.getvalue()
+
+
+def _import_cairosvg():
+    """
+    Imports the optional cairosvg dependency, raising a helpful ImportError when it is not available.
+    """
+    try:
+        import cairosvg
+    except (ImportError, OSError):
+        # cairosvg raises OSError when the system cairo library is missing
+        raise ImportError('Rendering SVG to raster formats requires cairosvg and the cairo library. '
+                          'Install it with: pip install qr_code_generator_api[raster]')
+    return cairosvg
+
+
+def _import_image():
+    """
+    Imports the Image module of the optional Pillow dependency, raising a helpful ImportError when it is not available.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError('Resizing raster images requires Pillow. '
+                          'Install it with: pip install qr_code_generator_api[raster]')
+    return Image
+
+
+def _svg_length(tag, attribute):
+    """
+    Reads a length attribute from an svg tag in pixels. Returns None when absent or relative.
+    >>> _svg_length('<svg width="500px" height="100%">', 'width')
+    500.0
+    >>> _svg_length('<svg width="500px" height="100%">', 'height') is None
+    True
+    """
+    match = re.search(r'\s' + attribute + r'\s*=\s*["\']\s*([0-9.]+)\s*(px)?\s*["\']', tag)
+    if not match:
+        return None
+    return float(match.group(1))
+
+
+def _set_svg_attribute(tag, attribute, value):
+    """
+    Replaces an attribute on an svg tag, or adds it when it is not yet present.
+    >>> _set_svg_attribute('<svg width="1">', 'width', '2')
+    '<svg width="2">'
+    """
+    pattern = r'(\s' + attribute + r'\s*=\s*)(["\'])[^"\']*\2'
+    if re.search(pattern, tag):
+        return re.sub(pattern, lambda m: f'{m.group(1)}{m.group(2)}{value}{m.group(2)}', tag, count=1)
+    end = -2 if tag.endswith('/>') else -1
+    return f'{tag[:end]} {attribute}="{value}"{tag[end:]}'
+
+
+def _format_number(number):
+    """
+    Formats a float without a trailing '.0' for whole numbers.
+    >>> _format_number(500.0)
+    '500'
+    """
+    return str(int(number)) if float(number).is_integer() else str(number)
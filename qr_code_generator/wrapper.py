@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 from qr_code_generator.errors import *
 from qr_code_generator.helpers import Config, Options, load_yaml
+from qr_code_generator.processing import RASTER_FORMATS, VECTOR_FORMATS, can_derive, check_dependencies, \
+    render_variant
 
+from concurrent.futures import ProcessPoolExecutor
 import requests
 import os
 import json
@@ -177,6 +180,16 @@ class QrGenerator:
     def handle_response(self, response):
         """
         Handles the response from the API by checking status code and choosing whether or not to call error handling.
+        When VARIANTS are configured, they are derived from the response content afterwards.
+        >>> class Response:
+        ...     status_code = 200
+        ...     text = '<svg width="500" height="500"></svg>'
+        >>> t = QrGenerator(FORCE_OVERWRITE=True, VARIANTS=[{'image_width': 250, 'image_format': 'svg'}])
+        >>> t.output_filename = 'doctest-response'
+        >>> t.handle_response(Response())
+        >>> with open('out/output/doctest-response-250.svg') as f:
+        ...     f.read()
+        '<svg width="250" height="250" viewBox="0 0 500 500"></svg>'
 
         Parameters
         ----------
@@ -190,7 +203,64 @@ class QrGenerator:
         self.__log(f'Received response from server. The code is: "{response}"')
         if not response.status_code == 200:
             self.handle_api_error(response)
-        self.to_output_file(response.text)
+
+        # Raster images are binary, so only SVG content can be handled as text
+        if self.options['image_format'].upper() in VECTOR_FORMATS:
+            content = response.text
+        else:
+            content = response.content
+        self.to_output_file(content)
+
+        if self.config['VARIANTS']:
+            self.post_process(content)
+
+    def post_process(self, content):
+        """
+        Derives all configured VARIANTS from a single fetched QR code, without sending additional requests to the API.
+        Every variant is written to the output folder as "<output_filename>-<image_width>.<image_format>".
+        Variants are expected to have passed validate(), which runs before the request is sent.
+        >>> t = QrGenerator(FORCE_OVERWRITE=True, POOL_THRESHOLD=2)
+        >>> t.set('VARIANTS', [{'image_width': width, 'image_format': 'SVG'} for width in (100, 200)])
+        >>> t.output_filename = 'doctest-pool'
+        >>> t.post_process('<svg width="500" height="500"></svg>')
+        >>> os.path.exists('out/output/doctest-pool-100.svg') and os.path.exists('out/output/doctest-pool-200.svg')
+        True
+
+        Parameters
+        ----------
+        content : str or bytes
+            The content of the fetched QR code. Text for SVG, bytes for raster formats.
+
+        Raises
+        ------
+        ValueError
+            A variant cannot be derived from the fetched QR code.
+
+        Returns
+        -------
+        None
+        """
+        source_format = self.options['image_format']
+        variants = self.config['VARIANTS']
+        self.__log(f'Deriving {len(variants)} variant(s) from the fetched {source_format} QR code.', 'warning')
+
+        widths = [int(variant['image_width']) for variant in variants]
+        formats = [variant['image_format'].upper() for variant in variants]
+        names = [f'{self.output_filename}-{width}' for width in widths]
+
+        # Only large batches are worth the overhead of spawning worker processes
+        if len(variants) >= self.config['POOL_THRESHOLD']:
+            self.__log(f'Rendering variants in a process pool.')
+            with ProcessPoolExecutor(max_workers=self.config['PROCESSES']) as pool:
+                results = list(pool.map(render_variant, [content] * len(variants), [source_format] * len(variants),
+                                        widths, formats))
+        else:
+            results = [render_variant(content, source_format, width, image_format)
+                       for width, image_format in zip(widths, formats)]
+
+        for name, image_format, result in zip(names, formats, results):
+            self.to_output_file(result, name, image_format)
+        self.__log(f'Successfully derived {len(variants)} variant(s).', 'success')
 
     def cleanup(self):
         """
@@ -210,14 +280,27 @@ class QrGenerator:
         self.__log('Resetting value for output_filename, making way for another go.')
         self.output_filename = None
 
-    def to_output_file(self, content):
+    def to_output_file(self, content, file_name=None, image_format=None):
         """
-        Writes the content of the response to the output file.
+        Writes the content of the response to the output file. Bytes are written in binary mode, text in text mode.
+        >>> t = QrGenerator(FORCE_OVERWRITE=True)
+        >>> t.to_output_file('<svg></svg>', 'doctest-text', 'SVG')
+        >>> with open('out/output/doctest-text.svg') as f:
+        ...     f.read()
+        '<svg></svg>'
+        >>> t.to_output_file(b'\\x89PNG\\r\\n', 'doctest-bytes', 'PNG')
+        >>> with open('out/output/doctest-bytes.png', 'rb') as f:
+        ...     f.read()
+        b'\\x89PNG\\r\\n'
 
         Parameters
         ----------
-        content : Response.text
-            The text content of the response that was sent by the API.
+        content : str or bytes
+            The content of the response that was sent by the API. Text for SVG, bytes for raster formats.
+        file_name : str
+            Default None. The name of the file to write to, without extension. Defaults to output_filename.
+        image_format : str
+            Default None. The format of the content, used as extension. Defaults to the image_format option.
 
         Raises
         ------
@@ -228,14 +311,16 @@ class QrGenerator:
         -------
         None
         """
+        file_name = file_name or self.output_filename
+        image_format = image_format or self.options['image_format']
         self.__log(f'Starting to write response content to output file.')
-        if self.output_file_exists() and not self.config['FORCE_OVERWRITE']:
+        if self.output_file_exists(file_name, image_format) and not self.config['FORCE_OVERWRITE']:
             self.__log(f'Cannot write to file. Selected output file exists and FORCE_OVERWRITE is disabled.', 'error')
             raise FileExistsError
-        file = self.config['OUT_FOLDER'] + '/' + self.config['OUTPUT_FOLDER'] + '/' + self.output_filename + '.' \
-            + self.options['image_format'].lower()
-        with open(file, 'w') as f:
-            f.writelines(content)
+        file = self.config['OUT_FOLDER'] + '/' + self.config['OUTPUT_FOLDER'] + '/' + file_name + '.' \
+            + image_format.lower()
+        with open(file, 'wb' if isinstance(content, bytes) else 'w') as f:
+            f.write(content)
         self.__log(f'Successfully wrote response content to "{file}".', 'success')
 
     def handle_api_error(self, response):
@@ -281,17 +366,26 @@ class QrGenerator:
         self.__log(f'Response for code: "{code}" was unhandled by wrapper. Sorry to not be more helpful.', 'error')
         raise UnknownApiError("An unhandled API exception occurred")
 
-    def output_file_exists(self):
+    def output_file_exists(self, file_name=None, image_format=None):
         """
         Checks whether or not the output file exists in the selected output folders.
 
+        Parameters
+        ----------
+        file_name : str
+            Default None. The name of the file to check, without extension. Defaults to output_filename.
+        image_format : str
+            Default None. The format of the file, used as extension. Defaults to the image_format option.
+
         Returns
         -------
         exists : bool
             Whether or not the output file does exists in the set output folder mapping.
         """
-        file = self.config['OUT_FOLDER'] + '/' + self.config['OUTPUT_FOLDER'] + '/' + self.output_filename + '.' + \
-            self.options['image_format'].lower()
+        file_name = file_name or self.output_filename
+        image_format = image_format or self.options['image_format']
+        file = self.config['OUT_FOLDER'] + '/' + self.config['OUTPUT_FOLDER'] + '/' + file_name + '.' + \
+            image_format.lower()
         self.__log(f'Checking if output file: "{file}" already exists.')
         if os.path.exists(file) and not os.stat(file).st_size == 0:
             self.__log(f'Output file: "{file}" does exist.')
@@ -388,6 +482,33 @@ class QrGenerator:
         """
         Validates the content in the request client-side to avoid getting errors processing.
         Since the API does not give back an error on missing parameter, we validate this to avoid pointless requests.
+        >>> t = QrGenerator(access_token='token', qr_code_text='Job', FORCE_OVERWRITE=True)
+        >>> t.output_filename = 'doctest-validate'
+        >>> t.set('VARIANTS', [{'image_width': 0, 'image_format': 'SVG'}])
+        >>> t.validate()
+        Traceback (most recent call last):
+        ValueError: Invalid variant: {'image_width': 0, 'image_format': 'SVG'}
+
+        >>> t.set('VARIANTS', [250])
+        >>> t.validate()
+        Traceback (most recent call last):
+        ValueError: Invalid variant: 250
+
+        >>> t.set('VARIANTS', [{'image_width': 10, 'image_format': 'SVG'}, {'image_width': 10, 'image_format': 'svg'}])
+        >>> t.validate()
+        Traceback (most recent call last):
+        ValueError: Duplicate variant: {'image_width': 10, 'image_format': 'svg'}
+
+        >>> t.set('image_format', 'PNG')
+        >>> t.set('VARIANTS', [{'image_width': 250, 'image_format': 'SVG'}])
+        >>> t.validate()
+        Traceback (most recent call last):
+        ValueError: Cannot derive a SVG variant from a PNG source
+
+        >>> t.set('VARIANTS', [{'image_width': 1000, 'image_format': 'PNG'}])
+        >>> t.validate()
+        Traceback (most recent call last):
+        ValueError: Variant width 1000 is larger than the fetched image_width 500
 
         Raises
         ------
@@ -397,6 +518,11 @@ class QrGenerator:
             The request is sent with a missing parameter, which would lead to an error on the server side.
         ValueError
             Output file name contains a '.' and thus an extension, which it should not.
+            Or a configured variant is invalid, duplicated, or cannot be derived from the requested image_format.
+        FileExistsError
+            A variant output file does already exist and cannot be overwritten due to config settings.
+        ImportError
+            A configured variant needs an optional dependency that is not installed.
 
         Returns
         -------
@@ -431,4 +557,41 @@ class QrGenerator:
                 self.__log(f'Missing a required parameter: {key}', 'error')
                 raise MissingRequiredParameterError(key)
 
+        # Check variants up front as well, since a bad one would only surface after the request has been spent
+        source_format = self.options['image_format'].upper()
+        seen = []
+        for variant in self.config['VARIANTS']:
+            try:
+                width = int(variant['image_width'])
+                image_format = str(variant['image_format']).upper()
+            except (KeyError, TypeError, ValueError):
+                self.__log(f'Variant {variant} needs an integer image_width and an image_format.', 'error')
+                raise ValueError(f'Invalid variant: {variant}')
+            if width <= 0:
+                self.__log(f'Variant {variant} needs a positive image_width.', 'error')
+                raise ValueError(f'Invalid variant: {variant}')
+            if not can_derive(source_format, image_format):
+                self.__log(f'A {image_format} variant cannot be derived from a {source_format} code.', 'error')
+                raise ValueError(f'Cannot derive a {image_format} variant from a {source_format} source')
+            if source_format in RASTER_FORMATS and width > int(self.options['image_width']):
+                self.__log(f'Variant {variant} would upscale the fetched code. Raise image_width instead.', 'error')
+                raise ValueError(f'Variant width {width} is larger than the fetched image_width '
+                                 f'{self.options["image_width"]}')
+            if (width, image_format) in seen:
+                self.__log(f'Variant {variant} is listed more than once.', 'error')
+                raise ValueError(f'Duplicate variant: {variant}')
+            seen.append((width, image_format))
+
+            name = f'{self.output_filename}-{width}'
+            if self.output_file_exists(name, image_format) and not self.config['FORCE_OVERWRITE']:
+                self.__log(f'Cannot write variant "{name}". Output file exists and FORCE_OVERWRITE is disabled.',
+                           'error')
+                raise FileExistsError
+
+        try:
+            check_dependencies(source_format, [image_format for _, image_format in seen])
+        except ImportError as e:
+            self.__log(str(e), 'error')
+            raise
+
         self.__log('All validation successful.', 'success')
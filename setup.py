@@ -25,6 +25,12 @@ setuptools.setup(
         'requests',
         'pyYaml',
     ],
+    extras_require={
+        'raster': [
+            'Pillow',
+            'cairosvg',
+        ],
+    },
     entry_points='''
     [console_scripts]
     qr_code_generator=qr_code_generator.__main__:main